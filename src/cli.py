@@ -4,7 +4,6 @@ from models.position_tracker import PositionTracker
 from models.routine import DEFAULT_ROUTINE_LENGTH
 from models.routine_tracker import RoutineTracker, TilizedRoutine
 from models.visualization_manager import VisualizationManager
-from awpy.visualization.plot import position_transform
 
 def test_routine_drawing():
     """Test drawing a routine from the example demo file."""
@@ -25,13 +24,7 @@ def test_routine_drawing():
 def test_heatmap_generation():
     """Test generating and visualizing a heatmap of player positions throughout the game from the example demo file."""
     data_manager = DataManager(EXAMPLE_DEMO_PATH, do_validate=False)
-    tracker = PositionTracker(data_manager.get_map_name(), 20)
-    for round_index in range(data_manager.get_round_count()):
-        for frame_index in range(data_manager.get_frame_count(round_index)):
-            for player_list in data_manager.get_player_info_lists(round_index, frame_index).values():
-                for player_info in player_list:
-                    transformed_x, transformed_y = position_transform(tracker.map_name, player_info['x'], 'x'), position_transform(tracker.map_name, player_info['y'], 'y')
-                    tracker.add_transformed_coordinates(transformed_x, transformed_y)
+    tracker = PositionTracker.from_data_manager(data_manager, 20)
     vizm = VisualizationManager.from_data_manager(data_manager)
     vizm.position_tracker = tracker
     vizm.draw_position_heatmap()
@@ -48,12 +41,10 @@ def test_routine_heatmap(do_aggregate_multiple_files: bool = False, heatmap_type
         tracker = RoutineTracker.aggregate_routines_from_directory(EXAMPLE_DEMO_PATH.parent / 'lan', data_manager.get_map_name(), tile_length, routine_length=DEFAULT_ROUTINE_LENGTH, limit=file_aggregation_limit)
     else:
         tracker = RoutineTracker(data_manager.get_map_name(), tile_length)
-    for round_index in range(data_manager.get_round_count()):
-        team_routines = data_manager.get_all_team_routines(round_index, DEFAULT_ROUTINE_LENGTH)
+    for team_routines in data_manager.get_all_round_routines(DEFAULT_ROUTINE_LENGTH):
         for team in (team_routines.t_side, team_routines.ct_side):
-            for player_routines in team.routines:
-                for routine in player_routines:
-                    tracker.add_routine(TilizedRoutine(routine, tile_length))
+            for routine in TilizedRoutine.from_team_routines(team, tile_length):
+                tracker.add_routine(routine)
     vizm = VisualizationManager.from_data_manager(data_manager)
     # Progressing the visualization to some arbitrary point in the game so the heatmap is more interesting than what it would look like from spawn positions.
     vizm.draw_round_start(0)
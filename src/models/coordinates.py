@@ -0,0 +1,13 @@
+import numpy as np
+from awpy.data import MAP_DATA
+
+def position_transform_batch(map_name: str, positions: np.ndarray) -> np.ndarray:
+    """Vectorized version of awpy's `position_transform` for an array of shape (..., 2) holding x and y values in its last axis.
+    Returns a new array of the same shape with both coordinates transformed to the map's image coordinate system. NaN values stay NaN."""
+    map_data = MAP_DATA[map_name]
+    scale = map_data['scale']
+    transformed = np.empty(positions.shape, dtype=float)
+    # Same arithmetic as position_transform, so the results are identical to transforming each value individually
+    transformed[..., 0] = (positions[..., 0] - map_data['pos_x']) / scale
+    transformed[..., 1] = (map_data['pos_y'] - positions[..., 1]) / scale
+    return transformed
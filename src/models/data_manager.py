@@ -1,8 +1,13 @@
-from collections import defaultdict
 from awpy.types import Game, GameRound, GameFrame, PlayerInfo, BombInfo, GrenadeAction
 from pathlib import Path
+import gzip
+from itertools import chain
+from operator import itemgetter
 import json
 from pydantic import TypeAdapter, ValidationError
+from typing import IO, Any
+from typing_extensions import TypedDict
+from models.coordinates import position_transform_batch
 from models.player import Player
 from models.round_events import RoundActions
 from models.round_stats import RoundStats
@@ -10,10 +15,11 @@ from models.team_routines import BothTeamsRoutines, TeamRoutines
 from models.team_names import TeamNames
 from models.team_scores import TeamScore
 from models.side_type import SideType
-from models.routine import FrameCount, Routine
-from typing import Generator 
+from models.routine import FrameCount
+from models.team_positions import TeamPositions
 from logging import Logger
 import re
+import numpy as np
 
 data_manager_logger = Logger("DataManager")
 
@@ -21,29 +27,122 @@ data_manager_logger = Logger("DataManager")
 EXAMPLE_DEMO_PATH = Path(__file__).parent / '../../demos/esta/0013db25-4444-452b-980b-7702dc6fb810.json'
 
 # For validating JSON data as a Game object
+# Built once at import time so the validator schema isn't rebuilt for every demo file that's loaded.
 game_validator = TypeAdapter(Game)
+
+class _GameHeader(TypedDict):
+    """The top-level fields of a Game object that DataManager relies on. The contents of rounds and frames are deliberately left unchecked."""
+    mapName: str
+    tickRate: int
+    parserParameters: dict[str, Any]
+    gameRounds: list[dict[str, Any]] | None
+
+# Validating every nested round, frame, and player of a Game is by far the slowest part of loading a demo, so by default only the top-level shape is checked
+game_header_validator = TypeAdapter(_GameHeader)
+# Demo JSON compresses very well, so demo files may also be stored gzipped
+GZIP_DEMO_FILE_SUFFIX = '.gz'
+
+def is_demo_file(file_path: Path) -> bool:
+    """Returns True if the path has the extension of a demo file, i.e. .json or .json.gz."""
+    return file_path.name.endswith('.json') or file_path.name.endswith('.json' + GZIP_DEMO_FILE_SUFFIX)
+
+def _open_demo_file(file_path: Path, mode: str) -> IO[Any]:
+    """Opens a demo file for reading, transparently decompressing it if it is gzipped. `mode` is either 'rb' or 'rt'."""
+    if file_path.suffix == GZIP_DEMO_FILE_SUFFIX:
+        return gzip.open(file_path, mode)
+    return open(file_path, mode)
+
 # This function exists outside of DataManager in case we want to use it elsewhere
-def _load_game_data(file_path: Path, do_validate: bool = True) -> Game:
-    """Loads a JSON file containing a Game object. If `do_validate` is True, the data will be validated against the Game schema."""
-    with open(file_path, 'r') as file:
-        try:
-            data = json.load(file)
-            if do_validate:
-                return game_validator.validate_python(data)
-            data_manager_logger.warn('Demo data was not validated against the Game schema on load. This may cause issues later on.')
-            return data
-        except ValidationError as e:
-            # TODO: Maybe handle this better
-            raise e
+def _load_game_data(file_path: Path, do_validate: bool = False) -> Game:
+    """Loads a JSON file (optionally gzipped) containing a Game object. If `do_validate` is True, the data will be validated against the full Game schema.
+    Otherwise, only the top-level fields are validated and the nested data is trusted as-is."""
+    with _open_demo_file(file_path, 'rb') as file:
+        raw_data = file.read()
+    try:
+        if do_validate:
+            # Parsing and validating straight from the raw bytes happens in a single pass inside pydantic-core,
+            # which is much faster than building Python dicts with the json module first and then validating those.
+            return game_validator.validate_json(raw_data)
+        data = json.loads(raw_data)
+        # The validated copy is discarded - this only checks that the data looks like a Game before we start indexing into it
+        game_header_validator.validate_python(data)
+        data_manager_logger.debug('Only the top level of the demo data was validated against the Game schema on load.')
+        return data
+    except ValidationError as e:
+        # TODO: Maybe handle this better
+        raise e
+
+def _build_team_positions(frames: list[GameFrame], team: SideType) -> TeamPositions:
+    """Collects the positions of every player on the given team across a round's frames into a single (frame count, player count, 2) array.
+    Players are given a slot in the order they first appear. Frames without data for a player are left as NaN."""
+    frame_count = len(frames)
+    team_key = team.value
+    team_player_lists = [frame[team_key]['players'] or [] for frame in frames]
+    players = list(chain.from_iterable(team_player_lists))
+    # itemgetter, map, and fromiter keep the per-player work out of the interpreter loop
+    player_names = list(map(itemgetter('name'), players))
+    coordinates = np.fromiter(chain.from_iterable(map(itemgetter('x', 'y'), players)), dtype=float, count=2 * len(players)).reshape(-1, 2)
+    # Dictionaries keep insertion order, so this gives every player a slot in the order they first appear
+    slot_by_player_name = {player_name: slot for slot, player_name in enumerate(dict.fromkeys(player_names))}
+    slot_count = len(slot_by_player_name)
+
+    # Usually the same players are listed in the same order in every frame, in which case the coordinates already form the (frame count, player count, 2) array
+    if len(players) == frame_count * slot_count and player_names[:slot_count] * frame_count == player_names:
+        return TeamPositions(player_names[:slot_count], coordinates.reshape(frame_count, slot_count, 2))
+
+    # Otherwise, players joined, left, or were reordered at some point, so each position is written into its player's slot
+    positions = np.full((frame_count, slot_count, 2), np.nan)
+    frame_indices = np.repeat(np.arange(frame_count), list(map(len, team_player_lists)))
+    slot_indices = list(map(slot_by_player_name.__getitem__, player_names))
+    positions[frame_indices, slot_indices] = coordinates
+    return TeamPositions(list(slot_by_player_name), positions)
+
+# Throw and destroy ticks of a round's grenades along with each grenade's index in the round's grenade list
+# and its thrower (start) and landing (end) positions, already transformed into map coordinates
+GRENADE_WINDOW_DTYPE = np.dtype([
+    ('throw_tick', np.int64), ('destroy_tick', np.int64), ('index', np.int64),
+    ('start_x', np.float64), ('start_y', np.float64), ('end_x', np.float64), ('end_y', np.float64)
+])
+
+def _build_grenade_windows(grenades: list[GrenadeAction], map_name: str) -> np.ndarray:
+    """Builds a structured array of the tick windows during which each grenade is in play, sorted by throw tick so active grenades can be found with a binary search.
+    Grenade positions are transformed here, once per round, so drawing a frame doesn't have to transform them again."""
+    windows = np.empty(len(grenades), dtype=GRENADE_WINDOW_DTYPE)
+    windows['throw_tick'] = [grenade['throwTick'] for grenade in grenades]
+    windows['destroy_tick'] = [grenade['destroyTick'] for grenade in grenades]
+    windows['index'] = np.arange(len(grenades))
+    # Shape (grenade count, 2 (start and end), 2 (x and y))
+    positions = np.array([((grenade['throwerX'], grenade['throwerY']), (grenade['grenadeX'], grenade['grenadeY'])) for grenade in grenades], dtype=float).reshape(-1, 2, 2)
+    transformed_positions = position_transform_batch(map_name, positions)
+    windows['start_x'], windows['start_y'] = transformed_positions[:, 0, 0], transformed_positions[:, 0, 1]
+    windows['end_x'], windows['end_y'] = transformed_positions[:, 1, 0], transformed_positions[:, 1, 1]
+    return windows[np.argsort(windows['throw_tick'], kind='stable')]
 
 class DataManager:
     """Wrapper around an awpy-generated Game object. Function calls replace direct dictionary access, including some error handling."""
     file_path: Path # Path to the demo file being parsed by awpy
     data: Game
-
-    def __init__(self, file_path: Path, do_validate: bool = True):
+    _map_name: str # Looked up once on load because it's needed for nearly every position transform
+
+    # Flattened views into `data`, so that per-frame accessors (which the GUI calls every tick) don't walk the nested dictionaries every time
+    _game_rounds: list[GameRound] | None
+    _frames_by_round: list[list[GameFrame] | None]
+    # Per-round preprocessing is only done the first time a round is accessed (keyed by round index), so loading a demo doesn't pay for rounds that are never looked at
+    # NOTE: This doesn't reduce memory use - the whole demo is still parsed into `data` on load. Loading rounds on demand would need a streaming JSON parser (e.g. ijson), which isn't a dependency.
+    _player_info_lists_by_round: dict[int, list[dict[SideType, list[PlayerInfo] | None]]]
+    _team_positions_by_round: dict[int, dict[SideType, TeamPositions]]
+    _grenade_windows_by_round: dict[int, np.ndarray]
+
+    def __init__(self, file_path: Path, do_validate: bool = False):
         self.file_path = file_path
         self.data = _load_game_data(file_path, do_validate)
+        self._map_name = self.data['mapName']
+
+        self._game_rounds = self.data['gameRounds']
+        self._frames_by_round = [game_round['frames'] for game_round in self._game_rounds or []]
+        self._player_info_lists_by_round = dict()
+        self._team_positions_by_round = dict()
+        self._grenade_windows_by_round = dict()
 
     def get_match_id(self) -> str | None:
         """Returns the match ID of the Game object, or None if no match ID is found."""
@@ -51,7 +150,7 @@ class DataManager:
     
     def _get_game_rounds(self) -> list[GameRound]:
         """Returns the list of GameRound objects in the Game object. If there are no game rounds, raises a ValueError."""
-        game_rounds = self.data['gameRounds']
+        game_rounds = self._game_rounds
         if game_rounds is None:
             raise ValueError("This game has no round data.")
         return game_rounds
@@ -73,8 +172,10 @@ class DataManager:
     
     def _get_frames(self, round_index: int) -> list[GameFrame]:
         """Returns the list of GameFrame objects in the given round. If there are no frames in the round, raises a ValueError."""
-        round_data = self.get_game_round(round_index)
-        frames = round_data['frames']
+        rounds = self._get_game_rounds()
+        if round_index >= len(rounds):
+            raise ValueError(f"Round index {round_index} out of bounds (max index is {len(rounds) - 1})")
+        frames = self._frames_by_round[round_index]
         if frames is None:
             raise ValueError("No frames found in round")
         return frames
@@ -88,22 +189,29 @@ class DataManager:
     
     def get_map_name(self) -> str:
         """Returns the name of the map in the Game object."""
-        return self.data['mapName']
+        return self._map_name
 
     def get_player_info_lists(self, round_index: int, frame_index: int) -> dict[SideType, list[PlayerInfo]]:
         """Returns the list of PlayerInfo objects for both teams in the given round and frame. If no player info is found for a team, raises a ValueError."""
-        frame_data = self.get_frame(round_index, frame_index)
-        ct_player_info_list = frame_data[SideType.CT.value]['players']
-        if ct_player_info_list is None:
-            raise ValueError(f"No player info found for team {SideType.CT.value} in round {round_index}, frame {frame_index}")
-        t_player_info_list = frame_data[SideType.T.value]['players']
-        if t_player_info_list is None:
-            raise ValueError(f"No player info found for team {SideType.T.value} in round {round_index}, frame {frame_index}")
-        return {
-            SideType.CT: ct_player_info_list,
-            SideType.T: t_player_info_list
-        }
+        frames = self._get_frames(round_index)
+        if frame_index >= len(frames):
+            raise ValueError(f"Frame index {frame_index} out of bounds (max index is {len(frames) - 1})")
+        player_info_lists = self._get_round_player_info_lists(round_index)[frame_index]
+        for team, player_info_list in player_info_lists.items():
+            if player_info_list is None:
+                raise ValueError(f"No player info found for team {team.value} in round {round_index}, frame {frame_index}")
+        # The lists are non-None at this point, so the narrower return type holds
+        return player_info_lists # type: ignore
     
+    def _get_round_player_info_lists(self, round_index: int) -> list[dict[SideType, list[PlayerInfo] | None]]:
+        """Returns both teams' player info lists for every frame of the given round, building them on first access. Assumes the round index has already been bounds-checked."""
+        if round_index not in self._player_info_lists_by_round:
+            self._player_info_lists_by_round[round_index] = [
+                {SideType.CT: frame[SideType.CT.value]['players'], SideType.T: frame[SideType.T.value]['players']}
+                for frame in self._frames_by_round[round_index] or []
+            ]
+        return self._player_info_lists_by_round[round_index]
+
     def get_bomb_info(self, round_index: int, frame_index: int) -> BombInfo:
         """Returns the BombInfo object for the given round and frame. If no bomb info is found, raises a ValueError."""
         frame_data = self.get_frame(round_index, frame_index)
@@ -159,57 +267,34 @@ class DataManager:
         player = self.get_player_at_frame(player_index, team, round_index, frame_index)
         return player['hp']
 
-    def _get_players_from_team_from_frame(self, frame: GameFrame, team: SideType) -> list[PlayerInfo]:
-        """Returns the list of T-side PlayerInfo objects from the given frame object. If no player info is found, raises a ValueError."""
-        players = frame[team.value]['players']
-        if players is None:
-            raise ValueError(f"No player info found for team {team.value} in frame")
-        return players
-    
     def _get_players_from_team(self, round_index: int, frame_index: int, team: SideType) -> list[PlayerInfo]:
         """Returns the list of T-side PlayerInfo objects for the given round and frame. If no player info is found, raises a ValueError."""
-        frame = self.get_frame(round_index, frame_index)
-        return self._get_players_from_team_from_frame(frame, team)
+        return self.get_player_info_lists(round_index, frame_index)[team]
+
+    def get_team_positions(self, round_index: int, team: SideType) -> TeamPositions:
+        """Returns the positions of every player on the given team for every frame of the given round."""
+        # Checks that the round exists and has frame data
+        frames = self._get_frames(round_index)
+        if round_index not in self._team_positions_by_round:
+            self._team_positions_by_round[round_index] = {side: _build_team_positions(frames, side) for side in SideType}
+        return self._team_positions_by_round[round_index][team]
 
     def get_all_team_routines(self, round_index: int, routine_length: FrameCount) -> BothTeamsRoutines:
         """Returns the routines for all players on both teams in the given round in the form of a BothTeams object."""
-        frames = self._get_frames(round_index)
+        map_name = self.get_map_name()
 
-        def batch_frames(frames: list[GameFrame], chunk_size: int) -> Generator[list[GameFrame], None, None]:
-            frame_count = len(frames)
-            for index in range(0, frame_count, chunk_size):
-                yield frames[index:min(index + chunk_size, frame_count)]
-
-        t_side_routines: dict[str, list[Routine]] = defaultdict(list)
-        ct_side_routines: dict[str, list[Routine]] = defaultdict(list)
-
-        for chunk in batch_frames(frames, routine_length):
-            t_side_positions: dict[str, list[tuple[float, float]]] = defaultdict(list)
-            ct_side_positions: dict[str, list[tuple[float, float]]] = defaultdict(list)
-            for frame in chunk:
-                for player in self._get_players_from_team_from_frame(frame, SideType.T):
-                    t_side_positions[player['name']].append((player['x'], player['y']))
-                for player in self._get_players_from_team_from_frame(frame, SideType.CT):
-                    ct_side_positions[player['name']].append((player['x'], player['y']))
-            for player_name in t_side_positions:
-                # Sometimes we don't have data for every player in a frame - if we have no position data for a player for a whole routine-length, we don't want to create a routine for them
-                if len(t_side_positions[player_name]) == 0:
-                    continue
-                t_side_routines[player_name].append(Routine(player_name, SideType.T, self.get_map_name(), t_side_positions[player_name]))
-            for player_name in ct_side_positions:
-                # Same as above
-                if len(ct_side_positions[player_name]) == 0:
-                    continue
-                ct_side_routines[player_name].append(Routine(player_name, SideType.CT, self.get_map_name(), ct_side_positions[player_name]))
-
-        t_side = TeamRoutines.from_routines_list(list(t_side_routines.values()))
-        ct_side = TeamRoutines.from_routines_list(list(ct_side_routines.values()))
+        def build_team_routines(team: SideType) -> TeamRoutines:
+            return TeamRoutines.from_team_positions(self.get_team_positions(round_index, team), team, map_name, routine_length)
 
         return BothTeamsRoutines(
-            t_side=t_side,
-            ct_side=ct_side
+            t_side=build_team_routines(SideType.T),
+            ct_side=build_team_routines(SideType.CT)
         )
 
+    def get_all_round_routines(self, routine_length: FrameCount) -> list[BothTeamsRoutines]:
+        """Returns the routines for all players on both teams for every round, in round order."""
+        return [self.get_all_team_routines(round_index, routine_length) for round_index in range(self.get_round_count())]
+
     def get_round_start_tick(self, round_index: int) -> int:
         """Returns the tick at which the given round started."""
         round = self.get_game_round(round_index)
@@ -279,6 +364,18 @@ class DataManager:
             raise ValueError("No grenade events found in round")
         return round['grenades']
 
+    def get_active_grenade_windows(self, round_index: int, tick: int) -> np.ndarray:
+        """Returns the rows of the given round's grenade windows (see GRENADE_WINDOW_DTYPE) for grenades that are in play (thrown, but not yet destroyed) at the given tick,
+        in the order the grenades appear in the round's grenade list."""
+        if round_index not in self._grenade_windows_by_round:
+            self._grenade_windows_by_round[round_index] = _build_grenade_windows(self.get_grenade_events(round_index), self.get_map_name())
+        windows = self._grenade_windows_by_round[round_index]
+        # Only grenades thrown at or before the tick can be active - these are a prefix of the sorted windows
+        thrown_count = np.searchsorted(windows['throw_tick'], tick, side='right')
+        thrown = windows[:thrown_count]
+        active = thrown[thrown['destroy_tick'] >= tick]
+        return active[np.argsort(active['index'])]
+
     def get_tick_rate(self) -> int:
         """Returns the rate at which the demo was recorded."""
         return self.data['tickRate']
@@ -296,7 +393,7 @@ def get_map_name_from_demo_file_without_parsing(file_path: Path) -> str | None:
     # We can find the map name by looking for this pattern
     pattern = re.compile(r'"mapName": "(\w+)"')
 
-    with open(file_path, 'r') as file:
+    with _open_demo_file(file_path, 'rt') as file:
         first_100_chars = file.read(100)
         match = pattern.search(first_100_chars)
         if match:
@@ -1,8 +1,10 @@
 from collections import Counter
 
-from models.data_manager import DataManager
+import numpy as np
 
-from awpy.visualization.plot import position_transform
+from models.coordinates import position_transform_batch
+from models.data_manager import DataManager
+from models.side_type import SideType
 
 class PositionTracker:
     """A class for tracking the cumulative amount of times players enter each tile on the map, with a configurable tile size."""
@@ -20,11 +22,12 @@ class PositionTracker:
         """Instantiates a PositionTracker object from a DataManager object and a tile length, adding the player positions from every game frame to the tracker."""
         tracker = cls(dm.get_map_name(), tile_length)
         for round_index in range(dm.get_round_count()):
-            for frame_index in range(dm.get_frame_count(round_index)):
-                for player_list in dm.get_player_info_lists(round_index, frame_index).values():
-                    for player_info in player_list:
-                        transformed_x, transformed_y = position_transform(tracker.map_name, player_info['x'], 'x'), position_transform(tracker.map_name, player_info['y'], 'y')
-                        tracker.add_transformed_coordinates(transformed_x, transformed_y)
+            for team in SideType:
+                # Every frame of the round at once, flattened to shape (frame count * player count, 2)
+                positions = dm.get_team_positions(round_index, team).positions.reshape(-1, 2)
+                # Skip the entries for frames in which a player had no data
+                positions = positions[~np.isnan(positions[:, 0])]
+                tracker.add_transformed_coordinates_array(position_transform_batch(tracker.map_name, positions))
         return tracker
     
     @property
@@ -52,3 +55,11 @@ class PositionTracker:
         tile_y = int(y / self._tile_length)
         self._tile_activity_counter[(tile_x, tile_y)] += 1
         return self._tile_activity_counter[(tile_x, tile_y)]
+
+    def add_transformed_coordinates_array(self, coordinates: np.ndarray):
+        """Increments the counters for the tiles that each of the given player positions fall into. `coordinates` has shape (position count, 2).
+        Equivalent to calling `add_transformed_coordinates` for every position, but the tiles are computed and counted for all positions at once."""
+        # Casting to int truncates towards zero, the same as calling int() on each value
+        tiles = (coordinates / self._tile_length).astype(int)
+        unique_tiles, counts = np.unique(tiles.reshape(-1, 2), axis=0, return_counts=True)
+        self._tile_activity_counter.update({(int(tile_x), int(tile_y)): int(count) for (tile_x, tile_y), count in zip(unique_tiles, counts)})
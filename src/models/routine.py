@@ -1,6 +1,8 @@
 from dataclasses import dataclass
 from typing import NewType, overload
 
+import numpy as np
+
 from models.side_type import SideType
 
 # This NewType exists to make sure we don't pass any kind of number in for FrameCount.
@@ -15,28 +17,47 @@ class Routine:
     player_name: str
     team: SideType
     map_name: str
-    _x: list[float]
-    _y: list[float]
+    _buffer: np.ndarray # Shape (capacity, 2), where the columns are the x and y values. Only the first `_length` rows are part of the routine.
+    _length: int
     
-    def __init__(self, player_name: str, team: SideType, map_name: str, positions: list[tuple[float, float]] | None = None):
+    def __init__(self, player_name: str, team: SideType, map_name: str, positions: np.ndarray | list[tuple[float, float]] | None = None, capacity: int = 0):
+        """Creates a routine from the given positions. Without positions, an empty buffer with room for `capacity` points is allocated for `add_point` to fill."""
         self.player_name = player_name
         self.team = team
         self.map_name = map_name
         if positions is None:
-            self._x = []
-            self._y = []
+            self._buffer = np.empty((capacity, 2))
+            self._length = 0
         else:
-            self._x, self._y = zip(*positions)
+            # Arrays (e.g. slices of a round's position array) are kept as-is so no per-point copying happens
+            self._buffer = np.asarray(positions, dtype=float).reshape(-1, 2)
+            self._length = len(self._buffer)
             
     @property
-    def x(self) -> list[float]:
-        """Returns a list of x values for the routine."""
-        return self._x
+    def x(self) -> np.ndarray:
+        """Returns an array of x values for the routine."""
+        return self._buffer[:self._length, 0]
     
     @property
-    def y(self) -> list[float]:
-        """Returns a list of y values for the routine."""
-        return self._y
+    def y(self) -> np.ndarray:
+        """Returns an array of y values for the routine."""
+        return self._buffer[:self._length, 1]
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Returns the (point count, 2) array of x and y values for the routine."""
+        return self._buffer[:self._length]
+
+    def add_point(self, x: float, y: float):
+        """Appends a point to the end of the routine.
+        Building routines from an array of positions is much faster - this is a fallback for when points only become available one at a time."""
+        if self._length == len(self._buffer):
+            # The buffer is full (or is a view into another array, which must not be written to), so move the points into a new, larger buffer
+            new_buffer = np.empty((max(2 * len(self._buffer), 1), 2))
+            new_buffer[:self._length] = self._buffer[:self._length]
+            self._buffer = new_buffer
+        self._buffer[self._length] = (x, y)
+        self._length += 1
 
     @overload
     def __getitem__(self, index: int) -> tuple[float, float]:
@@ -51,13 +72,13 @@ class Routine:
     def __getitem__(self, index: int | slice) -> tuple[float, float] | list[tuple[float, float]]:
         """Determines which indexing method to use based on the value of the index parameter and returns the correct amount of x and y tuple values"""
         if isinstance(index, int):
-            return self._x[index], self._y[index]
+            x, y = self.positions[index]
+            return float(x), float(y)
         elif isinstance(index, slice):
-            return list(zip(self._x[index.start:index.stop:index.step], self._y[index.start:index.stop:index.step]))
+            return [(float(x), float(y)) for x, y in self.positions[index]]
         else:
             raise TypeError("Index must be an integer or slice.")
     
     def __len__(self) -> int:
         """Returns the length of the routine."""
-        # Because x and y values are ensured to be the same length in the constructor, we can just return the length of one of them.
-        return len(self._x)
+        return self._length
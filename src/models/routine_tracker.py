@@ -1,10 +1,13 @@
 from collections import defaultdict, Counter
 from pathlib import Path
 from typing import overload
-from models.data_manager import DataManager, get_map_name_from_demo_file_without_parsing
+from models.data_manager import DataManager, get_map_name_from_demo_file_without_parsing, is_demo_file
 from models.demo_metadata import DemoMetadata
+from models.coordinates import position_transform_batch
 from models.routine import DEFAULT_ROUTINE_LENGTH, FrameCount, Routine
+from models.team_routines import TeamRoutines
 from awpy.visualization.plot import position_transform
+import numpy as np
 
 class TilizedRoutine(Routine):
     """An extension of the Routine class that includes the tilized x and y values for the routine - that is, the x and y values transformed into tile coordinates."""
@@ -12,12 +15,44 @@ class TilizedRoutine(Routine):
     _tilized_x: list[int] # The x values of the routine transformed into tile coordinates.
     _tilized_y: list[int] # The y values of the routine transformed into tile coordinates.
 
-    def __init__(self, routine: Routine, tile_length: int):
-        super().__init__(routine.player_name, routine.team, routine.map_name, list(zip(routine.x, routine.y)))
+    def __init__(self, routine: Routine, tile_length: int, tilized_x: list[int] | None = None, tilized_y: list[int] | None = None):
+        """Tilizes the given routine. If the tilized x and y values have already been computed (see `from_team_routines`), they can be passed in instead."""
+        # Shares the routine's position array rather than re-packing it point by point
+        super().__init__(routine.player_name, routine.team, routine.map_name, routine.positions)
         self._tile_length = tile_length
+        if tilized_x is not None and tilized_y is not None:
+            self._tilized_x = tilized_x
+            self._tilized_y = tilized_y
+            return
         # Transforming coordinates now as bucketing them into tiles and then transforming tile coordinates sounds like it would be less accurate - not sure if this feeling is true, though.
-        self._tilized_x = [int(position_transform(routine.map_name, x, 'x') / tile_length) for x in routine.x]
-        self._tilized_y = [int(position_transform(routine.map_name, y, 'y') / tile_length) for y in routine.y]
+        # Routines are only a handful of points long, so transforming them one at a time is cheaper than the overhead of NumPy calls.
+        self._tilized_x = [int(position_transform(routine.map_name, x, 'x') / tile_length) for x in routine.x.tolist()]
+        self._tilized_y = [int(position_transform(routine.map_name, y, 'y') / tile_length) for y in routine.y.tolist()]
+
+    @classmethod
+    def from_team_routines(cls, team_routines: TeamRoutines, tile_length: int) -> list['TilizedRoutine']:
+        """Tilizes every routine of every player on a team, in the same order as `team_routines.routines`.
+        The positions of the whole team are transformed and tilized at once, which is much cheaper than tilizing each routine separately."""
+        has_data = ~np.isnan(team_routines.positions[..., 0])
+        tilized_positions = np.zeros(team_routines.positions.shape, dtype=int)
+        # Casting to int truncates towards zero, the same as calling int() on each value
+        tilized_positions[has_data] = (position_transform_batch(team_routines.map_name, team_routines.positions[has_data]) / tile_length).astype(int)
+        # Nested lists are much faster to slice per routine than NumPy arrays
+        tilized_x, tilized_y = tilized_positions[..., 0].tolist(), tilized_positions[..., 1].tolist()
+        has_data_lists = has_data.tolist()
+
+        tilized_routines: list[TilizedRoutine] = []
+        for player_index in range(len(team_routines.player_names)):
+            routines = team_routines.get_player_routines(player_index)
+            for routine_index, routine in zip(team_routines.get_player_routine_indices(player_index), routines):
+                routine_tilized_x, routine_tilized_y = tilized_x[player_index][routine_index], tilized_y[player_index][routine_index]
+                routine_has_data = has_data_lists[player_index][routine_index]
+                # Drop the same frames that were dropped from the routine
+                if not all(routine_has_data):
+                    routine_tilized_x = [x for x, frame_has_data in zip(routine_tilized_x, routine_has_data) if frame_has_data]
+                    routine_tilized_y = [y for y, frame_has_data in zip(routine_tilized_y, routine_has_data) if frame_has_data]
+                tilized_routines.append(cls(routine, tile_length, routine_tilized_x, routine_tilized_y))
+        return tilized_routines
 
     @property
     def tile_length(self) -> int:
@@ -79,12 +114,10 @@ class RoutineTracker:
     def from_data_manager(cls, dm: DataManager, tile_length: int, routine_length: FrameCount = DEFAULT_ROUTINE_LENGTH) -> 'RoutineTracker':
         """Instantiates a RoutineTracker object from a DataManager object, a tile length, and an optional routine length, adding all the routines in the game to the tracker."""
         tracker = cls(dm.get_map_name(), tile_length, routine_length)
-        for round_index in range(dm.get_round_count()):
-            team_routines = dm.get_all_team_routines(round_index, routine_length)
+        for team_routines in dm.get_all_round_routines(routine_length):
             for team in (team_routines.t_side, team_routines.ct_side):
-                for player_routines in team.routines:
-                    for routine in player_routines:
-                        tracker.add_routine(TilizedRoutine(routine, tile_length))
+                for routine in TilizedRoutine.from_team_routines(team, tile_length):
+                    tracker.add_routine(routine)
         tracker._metadata = [DemoMetadata.from_data_manager(dm)]
         return tracker
 
@@ -100,7 +133,7 @@ class RoutineTracker:
         total_demos_to_aggregate = min(limit, total_file_count) if limit is not None else total_file_count
         
         for file_path in directory_path.iterdir():
-            if file_path.suffix == '.json':
+            if is_demo_file(file_path):
                 # Skip demos that aren't for the map we're interested in.
                 if get_map_name_from_demo_file_without_parsing(file_path) != map_name:
                     files_processed += 1
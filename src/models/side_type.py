@@ -7,10 +7,15 @@ class SideType(Enum):
     @classmethod
     def from_str(cls, side_str: str) -> 'SideType':
         """Creates an instance of the enum from a string, raising a ValueError if the string is not a valid types."""
-        if side_str.lower() == "ct":
-            return cls.CT
-        elif side_str.lower() == "t":
-            return cls.T
-        else:
+        side_type = SIDE_TYPE_BY_STR.get(side_str) or SIDE_TYPE_BY_STR.get(side_str.lower())
+        if side_type is None:
             raise ValueError(f"Invalid side type: {side_str}")
-    
\ No newline at end of file
+        return side_type
+
+# Maps the side strings found in demo data to their enum values, so from_str is a dictionary lookup rather than constructing the enum from a value.
+SIDE_TYPE_BY_STR: dict[str, SideType] = {
+    "CT": SideType.CT,
+    "ct": SideType.CT,
+    "T": SideType.T,
+    "t": SideType.T,
+}
@@ -0,0 +1,9 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+@dataclass
+class TeamPositions:
+    """The x and y positions of every player on one team for every frame of a round, stored as one contiguous array."""
+    player_names: list[str] # Player names in the order of the player axis of `positions`
+    positions: np.ndarray # Shape (frame count, player count, 2). Frames in which a player has no data are filled with NaN.
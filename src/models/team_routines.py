@@ -1,23 +1,61 @@
 from dataclasses import dataclass
-from models.routine import Routine
 
-@dataclass
+import numpy as np
+
+from models.routine import FrameCount, Routine
+from models.side_type import SideType
+from models.team_positions import TeamPositions
+
+@dataclass(slots=True, frozen=True)
 class TeamRoutines:
-    """A class tracking per-player routine lists for one team in a match."""
-    routines: list[list[Routine]]
+    """A class tracking per-player routines for one team in a match.
+    The routines are stored as one contiguous array and Routine objects are only created when a player's routines are requested."""
+    player_names: list[str] # Player names in the order of the player axis of `positions`
+    team: SideType
+    map_name: str
+    positions: np.ndarray # Shape (player count, routine count, routine length, 2). Frames in which a player has no data (and the padding after the last frame of the round) are filled with NaN.
 
     @classmethod
-    def from_routines_list(cls, routines: list[list[Routine]]) -> 'TeamRoutines':
-        """Instantiates object from a list of routines. The list should be a list of lists, where each inner list contains the routines for a player."""
-        return cls(routines)
+    def from_team_positions(cls, team_positions: TeamPositions, team: SideType, map_name: str, routine_length: FrameCount) -> 'TeamRoutines':
+        """Splits each player's positions in a round into consecutive routines of `routine_length` frames."""
+        frame_count, player_count, _ = team_positions.positions.shape
+        routine_count = -(-frame_count // routine_length)
+        # Pad the round out to a whole number of routines so the frame axis can be reshaped into (routine count, routine length)
+        padded_positions = np.full((routine_count * routine_length, player_count, 2), np.nan)
+        padded_positions[:frame_count] = team_positions.positions
+        positions = np.ascontiguousarray(padded_positions.reshape(routine_count, routine_length, player_count, 2).transpose(2, 0, 1, 3))
+        return cls(team_positions.player_names, team, map_name, positions)
+
+    @property
+    def routines(self) -> list[list[Routine]]:
+        """Returns one list of routines per player, in the same order as `player_names`."""
+        return [self.get_player_routines(player_index) for player_index in range(len(self.player_names))]
+
+    def get_player_routine_indices(self, player_index: int) -> list[int]:
+        """Returns the indices along the routine axis of `positions` of the given player's routines, in the same order as `get_player_routines`."""
+        # Sometimes we don't have data for every player in a frame - if we have no position data for a player for a whole routine-length, we don't want to create a routine for them
+        return np.flatnonzero(~np.isnan(self.positions[player_index, :, :, 0]).all(axis=1)).tolist()
 
     def get_player_routines(self, player_index: int) -> list[Routine]:
-        """Returns the routines for the given player index. Raises a ValueError if the player index is invalid."""
-        if player_index < 0 or player_index >= len(self.routines):
-            raise ValueError(f'Invalid player index: {player_index}. Must be between 0 and {len(self.routines) - 1}.')
-        return self.routines[player_index]
+        """Returns the routines for the given player index. Raises a ValueError if the player index is invalid.
+        The last routine of the round may be shorter than the routine length."""
+        if player_index < 0 or player_index >= len(self.player_names):
+            raise ValueError(f'Invalid player index: {player_index}. Must be between 0 and {len(self.player_names) - 1}.')
+        player_name = self.player_names[player_index]
+        player_positions = self.positions[player_index]
+        has_data = ~np.isnan(player_positions[:, :, 0])
+        routine_data_counts = has_data.sum(axis=1)
+
+        routines: list[Routine] = []
+        for routine_index in self.get_player_routine_indices(player_index):
+            routine_positions = player_positions[routine_index]
+            # Only copy the positions when some frames have to be dropped - otherwise the routine is a view into the team's routine array
+            if routine_data_counts[routine_index] != len(routine_positions):
+                routine_positions = routine_positions[has_data[routine_index]]
+            routines.append(Routine(player_name, self.team, self.map_name, routine_positions))
+        return routines
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BothTeamsRoutines:
     """A small, wrapper class for holding routine-tracking objects for both teams in a match."""
     t_side: TeamRoutines
@@ -1,5 +1,6 @@
 from typing import Counter
 from matplotlib.collections import PathCollection
+from matplotlib.colors import to_rgba
 from matplotlib.figure import Figure
 from matplotlib.axes import Axes
 from awpy.visualization.plot import plot_map, position_transform
@@ -8,13 +9,40 @@ from matplotlib.markers import MarkerStyle
 from matplotlib.quiver import Quiver
 from matplotlib.text import Text
 import matplotlib
+import numpy as np
 
+from models.coordinates import position_transform_batch
 from models.data_manager import DataManager
 from models.position_tracker import PositionTracker
 from models.routine import DEFAULT_ROUTINE_LENGTH, Routine
 from models.routine_tracker import RoutineTracker, TilizedRoutine
 from models.side_type import SideType
 
+TEAM_COLORS = {
+    SideType.T: 'goldenrod',
+    SideType.CT: 'lightblue',
+}
+
+GRENADE_COLORS = {
+    'Incendiary Grenade': 'red',
+    'Molotov': 'red',
+    'Smoke Grenade': 'gray',
+    'HE Grenade': 'green',
+    'Flashbang': 'gold',
+}
+
+# Frame artists (player positions, the bomb, grenades) are created once and reused, so heatmaps drawn later would be added after them and cover them at the same zorder.
+# Heatmaps are drawn below the default collection zorder (1) but above the map image (0) instead.
+HEATMAP_ZORDER = 0.5
+
+def _routine_alphas(frame_count: int) -> np.ndarray:
+    """Returns the opacities to draw player positions from 0, 1, ..., `frame_count - 1` frames ago with."""
+    # I wanted a function that for x = 0 returned 1, decreased linearly for a while, then asymptotically approached 0.
+    # I wanted this behavior because it means extremely long routines won't be too cluttered as the oldest frames will be almost invisible, 
+    # but I also wanted a clear, steady decrease of opacity for the most recent frames in the routine.
+    frame_index_subtrahends = np.arange(frame_count)
+    return np.maximum(1 - 0.1*frame_index_subtrahends, 1/(frame_index_subtrahends + 1))
+
 class VisualizationManager:
     dm: DataManager
     fig: Figure
@@ -23,13 +51,26 @@ class VisualizationManager:
     current_round_index: int
     current_frame_index: int
 
-    lines: list[Line2D] # Tracks lines for precise removal
-    path_collections: list[PathCollection] # Tracks scatter plot points for precise removal
-    text: list[Text] # Tracks text for precise removal
+    # Routine lines are kept and reused by later `draw_routine` calls that use the default style, rather than being removed and re-created
+    routine_line_drawings: list[Line2D]
+    _routine_line_is_default_style: list[bool] # Whether the line at the same index in `routine_line_drawings` was created without a fmt string or kwargs
+    _routine_line_drawing_count: int # The number of routine lines currently in use
+
+    # Frame-related artists are created once and then updated in place (or hidden) every frame, rather than being removed and re-created
+    player_position_drawings: dict[SideType, PathCollection] # Per team, a single scatter plot holding the current positions and every frame of routine history
+    player_name_drawings: list[Text]
+    bomb_drawing: PathCollection | None
+    grenade_line_drawings: list[Line2D] # One per grenade slot, paired with the scatter plot at the same index in `grenade_drawings`
+    grenade_drawings: list[PathCollection]
 
     visualized_routine_length: int
     do_visualize_routines: bool
 
+    _transformed_positions_round_index: int | None # The round that `_transformed_positions` was computed for
+    _transformed_positions: dict[SideType, np.ndarray] # Player positions for every frame of a round, already transformed into map coordinates
+    _grenade_colors_round_index: int | None # The round that `_grenade_colors` was computed for
+    _grenade_colors: dict[int, tuple[str, str]] # Keyed by index in a round's grenade list, the color of the grenade and the color of the thrower's team
+
     _position_tracker: PositionTracker | None
     position_tracker_drawings: PathCollection | None
 
@@ -50,9 +91,20 @@ class VisualizationManager:
         self.visualized_routine_length = visualized_routine_length
         self.do_visualize_routines = False
 
-        self.lines = list()
-        self.path_collections = list()
-        self.text = list()
+        self.routine_line_drawings = list()
+        self._routine_line_is_default_style = list()
+        self._routine_line_drawing_count = 0
+
+        self.player_position_drawings = dict()
+        self.player_name_drawings = list()
+        self.bomb_drawing = None
+        self.grenade_line_drawings = list()
+        self.grenade_drawings = list()
+
+        self._transformed_positions_round_index = None
+        self._transformed_positions = dict()
+        self._grenade_colors_round_index = None
+        self._grenade_colors = dict()
         
         self._position_tracker = None
         self.position_tracker_drawings = None
@@ -69,6 +121,8 @@ class VisualizationManager:
             map_type='simpleradar',
             dark=True
         )
+        # The map image already sets the limits we want - stop drawings from triggering autoscaling (and moving the map around)
+        axes.set_autoscale_on(False)
         return cls(dm, fig, axes)
 
     def render(self):
@@ -78,12 +132,27 @@ class VisualizationManager:
     def draw_routine(self, routine: Routine, fmt: str = '', **kwargs) -> Axes:
         """Draws a routine on the map. `fmt` is a format string following matplotlib fmt string notation, and kwargs can be used to add additional format options (overwriting any conflicting options from the format string)."""
 
-        map_name = self.dm.get_map_name()
-
-        transformed_x = [position_transform(map_name, xpos, 'x') for xpos in routine.x]
-        transformed_y = [position_transform(map_name, ypos, 'y') for ypos in routine.y]
-
-        self.lines.extend(self.axes.plot(transformed_x, transformed_y, fmt, **kwargs))
+        transformed_positions = position_transform_batch(self.dm.get_map_name(), routine.positions)
+
+        index = self._routine_line_drawing_count
+        # Only default-styled lines are reused - comparing arbitrary kwargs (which may be arrays) for equality isn't reliable
+        is_default_style = fmt == '' and not kwargs
+        if index < len(self.routine_line_drawings) and is_default_style and self._routine_line_is_default_style[index]:
+            # The unused line in this slot also has the default style, so only the data has to change
+            line = self.routine_line_drawings[index]
+            line.set_data(transformed_positions[:, 0], transformed_positions[:, 1])
+            line.set_visible(True)
+        else:
+            # Let `plot` apply the format string and kwargs so they behave exactly as documented by matplotlib
+            line, = self.axes.plot(transformed_positions[:, 0], transformed_positions[:, 1], fmt, **kwargs)
+            if index < len(self.routine_line_drawings):
+                self.routine_line_drawings[index].remove()
+                self.routine_line_drawings[index] = line
+                self._routine_line_is_default_style[index] = is_default_style
+            else:
+                self.routine_line_drawings.append(line)
+                self._routine_line_is_default_style.append(is_default_style)
+        self._routine_line_drawing_count += 1
         return self.axes
     
     def toggle_routine_visualization(self):
@@ -126,6 +195,7 @@ class VisualizationManager:
         maximum_visit_count = max(self._position_tracker.tile_activity_counter.values() or [1]) # If there are no visits, set the maximum visit count to 1 to avoid division by zero
         scaled_visit_values = [count/maximum_visit_count for count in self._position_tracker.tile_activity_counter.values()]
 
+        kwargs.setdefault('zorder', HEATMAP_ZORDER)
         self.position_tracker_drawings = self.axes.scatter(transformed_x, transformed_y, c=scaled_visit_values, marker=MarkerStyle('s', 'full'), s=self._position_tracker._tile_length, alpha=0.5, cmap='YlOrRd', **kwargs)
         return self.axes
     
@@ -158,6 +228,7 @@ class VisualizationManager:
         # Clear any existing heatmap drawings
         self._clear_routine_heatmap_drawings()
 
+        map_name = self.dm.get_map_name()
         alive_player_tiles: set[tuple[int, int]] = set()
 
         player_info_lists = self.dm.get_player_info_lists(self.current_round_index, self.current_frame_index)
@@ -165,8 +236,8 @@ class VisualizationManager:
             if player['isAlive'] is False:
                 continue
             
-            tile_x = int(position_transform(self.dm.get_map_name(), player['x'], 'x') / self._routine_tracker.tile_length)
-            tile_y = int(position_transform(self.dm.get_map_name(), player['y'], 'y') / self._routine_tracker.tile_length)
+            tile_x = int(position_transform(map_name, player['x'], 'x') / self._routine_tracker.tile_length)
+            tile_y = int(position_transform(map_name, player['y'], 'y') / self._routine_tracker.tile_length)
 
             alive_player_tiles.add((tile_x, tile_y))
 
@@ -185,6 +256,7 @@ class VisualizationManager:
         most_common_routine_count = max(activity_surrounding_alive_player_tiles.values() or [1]) # If there are no routines, set the most common routine count to 1 to avoid division by zero
         scaled_visit_values = [count/most_common_routine_count for count in activity_surrounding_alive_player_tiles.values()]
 
+        kwargs.setdefault('zorder', HEATMAP_ZORDER)
         self.routine_tracker_tile_drawings = self.axes.scatter(transformed_x, transformed_y, c=scaled_visit_values, marker=MarkerStyle('s', 'full'), s=self._routine_tracker.tile_length, alpha=0.75, cmap='YlOrRd', **kwargs)
         return self.axes
     
@@ -196,6 +268,7 @@ class VisualizationManager:
         # Clear any existing heatmap drawings
         self._clear_routine_heatmap_drawings()
 
+        map_name = self.dm.get_map_name()
         alive_player_tiles: set[tuple[int, int]] = set()
 
         player_info_lists = self.dm.get_player_info_lists(self.current_round_index, self.current_frame_index)
@@ -203,8 +276,8 @@ class VisualizationManager:
             if player['isAlive'] is False:
                 continue
             
-            tile_x = int(position_transform(self.dm.get_map_name(), player['x'], 'x') / self._routine_tracker.tile_length)
-            tile_y = int(position_transform(self.dm.get_map_name(), player['y'], 'y') / self._routine_tracker.tile_length)
+            tile_x = int(position_transform(map_name, player['x'], 'x') / self._routine_tracker.tile_length)
+            tile_y = int(position_transform(map_name, player['y'], 'y') / self._routine_tracker.tile_length)
 
             alive_player_tiles.add((tile_x, tile_y))
 
@@ -221,6 +294,7 @@ class VisualizationManager:
         # Pylance doesn't recognize the colormaps attribute of matplotlib, so I'm (begrudgingly) using a type ignore here.
         colormap = matplotlib.colormaps['YlOrRd'] # type: ignore
         
+        kwargs.setdefault('zorder', HEATMAP_ZORDER)
         for routine, count in routines_from_alive_player_tiles.items():
             transformed_x = [(tile[0] + 0.5) * self._routine_tracker.tile_length for tile in zip(routine.tilized_x, routine.tilized_y)]
             transformed_y = [(tile[1] + 0.5) * self._routine_tracker.tile_length for tile in zip(routine.tilized_x, routine.tilized_y)]
@@ -244,17 +318,63 @@ class VisualizationManager:
     
     def _clear_frame_related_drawings(self):
         """Clears all frame-related drawings (e.g. player positions, grenades - i.e. non-heatmap related drawings) from the figure."""
-        for line in self.lines:
-            line.remove()
-        self.lines.clear()
-        
-        for collection in self.path_collections:
-            collection.remove()
-        self.path_collections.clear()
-
-        for text in self.text:
-            text.remove()
-        self.text.clear()
+        # The reusable artists are only hidden - drawing the next frame (or routine) shows the ones it needs again
+        for line in self.routine_line_drawings:
+            line.set_visible(False)
+        self._routine_line_drawing_count = 0
+        for collection in self.player_position_drawings.values():
+            collection.set_visible(False)
+        for text in self.player_name_drawings:
+            text.set_visible(False)
+        if self.bomb_drawing is not None:
+            self.bomb_drawing.set_visible(False)
+        for line in self.grenade_line_drawings:
+            line.set_visible(False)
+        for collection in self.grenade_drawings:
+            collection.set_visible(False)
+
+    def _get_player_position_drawing(self, team: SideType) -> PathCollection:
+        """Returns the scatter plot used to draw the given team's positions, creating it if it doesn't exist yet."""
+        if team not in self.player_position_drawings:
+            self.player_position_drawings[team] = self.axes.scatter([], [], c=TEAM_COLORS[team])
+        return self.player_position_drawings[team]
+
+    def _get_player_name_drawing(self, index: int) -> Text:
+        """Returns the text object used to draw the player name at the given index, creating it if it doesn't exist yet."""
+        while len(self.player_name_drawings) <= index:
+            self.player_name_drawings.append(self.axes.text(0, 0, '', fontsize=10, ha='center', va='bottom', color='white'))
+        return self.player_name_drawings[index]
+
+    def _get_grenade_drawings(self, index: int) -> tuple[Line2D, PathCollection]:
+        """Returns the trajectory line and the landing point scatter plot used to draw the grenade at the given index, creating them if they don't exist yet."""
+        while len(self.grenade_drawings) <= index:
+            # Colors are set when the grenade is drawn - giving placeholders here keeps these from advancing the axes' default color cycle
+            self.grenade_line_drawings.append(self.axes.add_line(Line2D([], [])))
+            self.grenade_drawings.append(self.axes.scatter([], [], c='none'))
+        return self.grenade_line_drawings[index], self.grenade_drawings[index]
+
+    def _get_transformed_team_positions(self, team: SideType) -> np.ndarray:
+        """Returns the positions of the given team's players for every frame of the current round, transformed into map coordinates.
+        The whole round is transformed at once the first time it is needed so that drawing a frame only has to index into the result."""
+        if self._transformed_positions_round_index != self.current_round_index:
+            map_name = self.dm.get_map_name()
+            self._transformed_positions = {
+                side: position_transform_batch(map_name, self.dm.get_team_positions(self.current_round_index, side).positions)
+                for side in SideType
+            }
+            self._transformed_positions_round_index = self.current_round_index
+        return self._transformed_positions[team]
+
+    def _get_grenade_colors(self, grenade_index: int) -> tuple[str, str]:
+        """Returns the grenade color and thrower team color for the grenade at the given index in the current round's grenade list.
+        Each grenade's colors are looked up the first time it is drawn in a round rather than on every frame."""
+        if self._grenade_colors_round_index != self.current_round_index:
+            self._grenade_colors = dict()
+            self._grenade_colors_round_index = self.current_round_index
+        if grenade_index not in self._grenade_colors:
+            grenade = self.dm.get_grenade_events(self.current_round_index)[grenade_index]
+            self._grenade_colors[grenade_index] = (GRENADE_COLORS[grenade['grenadeType']], TEAM_COLORS[SideType.from_str(grenade['throwerSide'])])
+        return self._grenade_colors[grenade_index]
 
     def _draw_frame(self) -> Axes:
         """Draws the current frame. Raises a ValueError if the current round index or the current frame index is out of bounds."""
@@ -269,69 +389,63 @@ class VisualizationManager:
 
         map_name = self.dm.get_map_name()
 
-        # I wanted a function that for x = 0 returned 1, decreased linearly for a while, then asymptotically approached 0.
-        # I wanted this behavior because it means extremely long routines won't be too cluttered as the oldest frames will be almost invisible, 
-        # but I also wanted a clear, steady decrease of opacity for the most recent frames in the routine.
-        alpha_function = lambda x: max(1 - 0.1*x, 1/(x + 1))
-
         routine_length = self.visualized_routine_length if self.do_visualize_routines else 0
-        for frame_index_subtrahend in range(0, routine_length + 1):
-            # Ensure we don't try to access a frame index that doesn't exist
-            if self.current_frame_index - frame_index_subtrahend < 0:
-                break
-
-            frame_index = self.current_frame_index - frame_index_subtrahend
-
-            player_info_lists = self.dm.get_player_info_lists(self.current_round_index, frame_index)
-            t_side_players = player_info_lists[SideType.T]
-            ct_side_players = player_info_lists[SideType.CT]
-
-            transformed_t_x = [position_transform(map_name, player['x'], 'x') for player in t_side_players]
-            transformed_t_y = [position_transform(map_name, player['y'], 'y') for player in t_side_players]
-            self.path_collections.append(self.axes.scatter(transformed_t_x, transformed_t_y, c='goldenrod', alpha=alpha_function(frame_index_subtrahend)))
-
-            transformed_ct_x = [position_transform(map_name, player['x'], 'x') for player in ct_side_players]
-            transformed_ct_y = [position_transform(map_name, player['y'], 'y') for player in ct_side_players]
-            self.path_collections.append(self.axes.scatter(transformed_ct_x, transformed_ct_y, c='lightblue', alpha=alpha_function(frame_index_subtrahend)))
+        # Ensure we don't try to access a frame index that doesn't exist
+        history_frame_count = min(routine_length, self.current_frame_index) + 1
+        alphas = _routine_alphas(history_frame_count)
+
+        name_drawing_count = 0
+        for team in SideType:
+            # Shape (frame count, player count, 2) - players without data in a frame are NaN
+            transformed_positions = self._get_transformed_team_positions(team)
+            player_count = transformed_positions.shape[1]
+
+            # The current frame followed by progressively older frames, flattened into one list of points so the whole history is drawn by one scatter plot
+            first_frame_index = self.current_frame_index - history_frame_count + 1
+            history = transformed_positions[first_frame_index:self.current_frame_index + 1][::-1].reshape(-1, 2)
+            colors = np.tile(to_rgba(TEAM_COLORS[team]), (len(history), 1))
+            colors[:, 3] = np.repeat(alphas, player_count)
+            has_data = ~np.isnan(history[:, 0])
+
+            drawing = self._get_player_position_drawing(team)
+            drawing.set_offsets(history[has_data])
+            drawing.set_facecolors(colors[has_data])
+            drawing.set_visible(True)
 
             # Draw player names only for the most recent frame
-            if frame_index_subtrahend == 0:
-                for index, player in enumerate(t_side_players):
-                    self.text.append(self.axes.text(transformed_t_x[index], transformed_t_y[index], player['name'], fontsize=10, ha='center', va='bottom', color='white'))
-                for index, player in enumerate(ct_side_players):
-                    self.text.append(self.axes.text(transformed_ct_x[index], transformed_ct_y[index], player['name'], fontsize=10, ha='center', va='bottom', color='white'))
+            player_names = self.dm.get_team_positions(self.current_round_index, team).player_names
+            for player_name, (x, y) in zip(player_names, transformed_positions[self.current_frame_index]):
+                if np.isnan(x):
+                    continue
+                text = self._get_player_name_drawing(name_drawing_count)
+                text.set_position((x, y))
+                text.set_text(player_name)
+                text.set_visible(True)
+                name_drawing_count += 1
 
         bomb_info = self.dm.get_bomb_info(self.current_round_index, self.current_frame_index)
         bomb_x = position_transform(map_name, bomb_info['x'], 'x')
         bomb_y = position_transform(map_name, bomb_info['y'], 'y')
-        self.path_collections.append(self.axes.scatter(bomb_x, bomb_y, c='red')) # Maybe pick a better color for the bomb as fire grenades are also red
+        if self.bomb_drawing is None:
+            self.bomb_drawing = self.axes.scatter([], [], c='red') # Maybe pick a better color for the bomb as fire grenades are also red
+        self.bomb_drawing.set_offsets([(bomb_x, bomb_y)])
+        self.bomb_drawing.set_visible(True)
 
         # Plot grenades
         current_frame_tick = self.dm.get_frame(self.current_round_index, self.current_frame_index)['tick']
 
-        grenade_color_map = {
-            'Incendiary Grenade': 'red',
-            'Molotov': 'red',
-            'Smoke Grenade': 'gray',
-            'HE Grenade': 'green',
-            'Flashbang': 'gold',
-        }
-
-        thrower_color_map = {
-            SideType.T: 'goldenrod',
-            SideType.CT: 'lightblue',
-        }
-
-        for grenade in self.dm.get_grenade_events(self.current_round_index):
-            if grenade['throwTick'] <= current_frame_tick <= grenade['destroyTick']:
-                start_x = position_transform(map_name, grenade['throwerX'], 'x')
-                start_y = position_transform(map_name, grenade['throwerY'], 'y')
-                end_x = position_transform(map_name, grenade['grenadeX'], 'x')
-                end_y = position_transform(map_name, grenade['grenadeY'], 'y')
-                grenade_color = grenade_color_map[grenade['grenadeType']]
-                thrower_color = thrower_color_map[SideType.from_str(grenade['throwerSide'])]
-                self.lines.extend(self.axes.plot([start_x, end_x], [start_y, end_y], color=grenade_color))
-                self.path_collections.append(self.axes.scatter(end_x, end_y, color=grenade_color, edgecolors=thrower_color))
+        # Grenade positions in these rows are already transformed into map coordinates
+        for index, grenade in enumerate(self.dm.get_active_grenade_windows(self.current_round_index, current_frame_tick)):
+            grenade_color, thrower_color = self._get_grenade_colors(int(grenade['index']))
+            end_x, end_y = grenade['end_x'], grenade['end_y']
+            line, collection = self._get_grenade_drawings(index)
+            line.set_data([grenade['start_x'], end_x], [grenade['start_y'], end_y])
+            line.set_color(grenade_color)
+            line.set_visible(True)
+            collection.set_offsets([(end_x, end_y)])
+            collection.set_facecolor(grenade_color)
+            collection.set_edgecolor(thrower_color)
+            collection.set_visible(True)
 
         return self.axes
     
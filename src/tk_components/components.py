@@ -102,7 +102,8 @@ class MainApplication(ttk.Frame):
             raise ValueError('VisualizationManager not initialized.')
 
         # Canvas
-        self.canvas.canvas.draw()
+        # Let Tk redraw the figure when it's idle rather than blocking here - this is called every tick during playback
+        self.canvas.canvas.draw_idle()
         
         # Game state label
         self.game_state_label.refresh_label()
@@ -208,8 +209,8 @@ class TopBarMenu(ttk.Frame):
         self.pack(side='top', fill='x')
     
     def open_demo_file(self):
-        """Prompts user to select a .json file (ideally, this is the .json file corresponding to a CS:GO demo) and updates the main application's DataManager and VisualizationManager."""
-        file_dialog_response = filedialog.askopenfilename(title='Select a CS:GO demo file', filetypes=[('JSON files', '*.json'), ('All files', '*.*')])
+        """Prompts user to select a .json or .json.gz file (ideally, this is the .json file corresponding to a CS:GO demo) and updates the main application's DataManager and VisualizationManager."""
+        file_dialog_response = filedialog.askopenfilename(title='Select a CS:GO demo file', filetypes=[('JSON files', '*.json *.json.gz'), ('All files', '*.*')])
         if file_dialog_response == "":
             # User cancelled the file dialog
             return
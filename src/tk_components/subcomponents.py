@@ -1,4 +1,5 @@
 import tkinter as tk
+from tkinter import font as tkfont
 from tkinter import ttk
 from awpy.types import PlayerInfo
 
@@ -10,17 +11,25 @@ class PlayerInfoFrame(ttk.Frame):
     """A frame that displays information about a player."""
     player_name: str
     health_bar_canvas: tk.Canvas
-    info_label: tk.Text
+    info_text: tk.StringVar
+    info_label: ttk.Label
+    _health_bar_id: int # Canvas item ID of the health bar rectangle, which is resized and recolored rather than re-created
 
     def __init__(self, parent: ttk.Frame, *args, **kwargs):
         super().__init__(parent, *args, **kwargs)
 
         self.health_bar_canvas = tk.Canvas(self, height=5)
         self.health_bar_canvas.pack(fill=tk.X)
+        self._health_bar_id = self.health_bar_canvas.create_rectangle(0, 0, 0, 5, fill='')
 
         self.player_name = ''
 
-        self.info_label = tk.Text(self, width=40, height=5)
+        self.info_text = tk.StringVar(self)
+        # Labels don't wrap on their own, so long lines (e.g. a full inventory) would be cut off at the label's width.
+        # `width` is in characters but `wraplength` is in pixels, so convert using the width of a character in the label's font.
+        info_label_width = 40
+        info_label_wraplength = info_label_width * tkfont.nametofont('TkDefaultFont').measure('0')
+        self.info_label = ttk.Label(self, textvariable=self.info_text, width=info_label_width, wraplength=info_label_wraplength, anchor=tk.NW, justify=tk.LEFT)
         self.info_label.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
 
         self.pack()
@@ -36,31 +45,30 @@ class PlayerInfoFrame(ttk.Frame):
         has_defuse = player_info['hasDefuse']
         has_helmet = player_info['hasHelmet']
 
-        self.info_label.config(state=tk.NORMAL)
-        self.info_label.delete('1.0', tk.END)
         hp_status_info_string = f'{name} | HP: {hp}'
         if armor > 0:
             hp_status_info_string += f' | Armor {"(with Helmet)" if has_helmet else ""}: {armor}'
-        self.info_label.insert(tk.END, f'{hp_status_info_string}\n')
-        self.info_label.insert(tk.END, f'Weapons: {", ".join(weapons)}\n')
-        self.info_label.insert(tk.END, f'Money: {money}\n')
+        info_lines = [
+            hp_status_info_string,
+            f'Weapons: {", ".join(weapons)}',
+            f'Money: {money}'
+        ]
 
         hp_bar_fill_color: str
         match SideType.from_str(player_info['side']):
             case SideType.T:
-                self.info_label.insert(tk.END, f'Has Bomb: {has_bomb}\n')
+                info_lines.append(f'Has Bomb: {has_bomb}')
                 hp_bar_fill_color = 'goldenrod'
             case SideType.CT:
-                self.info_label.insert(tk.END, f'Has Defuse: {has_defuse}\n')
+                info_lines.append(f'Has Defuse: {has_defuse}')
                 hp_bar_fill_color = 'lightblue'
         
-        self.info_label.config(state=tk.DISABLED)
+        self.info_text.set('\n'.join(info_lines))
 
-        # Update the health bar
-        self.health_bar_canvas.delete('all')
+        # Update the health bar. Tk redraws it on its own once the event loop is idle, so no explicit update() call is needed.
         hp_bar_width = int(self.winfo_width() * (hp / 100))
-        self.health_bar_canvas.create_rectangle(0, 0, hp_bar_width, 5, fill=hp_bar_fill_color)
-        self.health_bar_canvas.update()
+        self.health_bar_canvas.coords(self._health_bar_id, 0, 0, hp_bar_width, 5)
+        self.health_bar_canvas.itemconfigure(self._health_bar_id, fill=hp_bar_fill_color)
 
 class RoutineMenuButtonNames(Enum):
     """The names of the buttons in the Routine menu enumified so we don't have to worry about the pitfalls of magic strings."""